@@ -8,17 +8,196 @@ Rekayasa Fitur - Computer Vision
 import cv2
 import numpy as np
 import time
+import os
+import sys
+import argparse
+import threading
+from collections import deque
+
+def create_background_subtractor(kind='mog2'):
+    """
+    Buat background subtractor untuk SimpleMotionDetector
+    
+    Args:
+        kind (str): 'mog2' (default) atau 'mog'. 'mog' memakai MOG lama dari
+            modul bgsegm (opencv-contrib-python) dengan 3 Gaussian per piksel,
+            lebih ringan untuk scene luar ruangan yang noisy. Jika bgsegm tidak
+            tersedia, otomatis kembali ke MOG2.
+    """
+    if kind == 'mog':
+        if hasattr(cv2, 'bgsegm'):
+            return cv2.bgsegm.createBackgroundSubtractorMOG(
+                history=200, nmixtures=3, backgroundRatio=0.7)
+        print("⚠️ cv2.bgsegm tidak tersedia (butuh opencv-contrib-python), menggunakan MOG2")
+    # Deteksi bayangan dimatikan: mask hanya dipakai untuk mencari area
+    # gerakan, jadi uji bayangan per piksel hanya membuang waktu
+    return cv2.createBackgroundSubtractorMOG2(
+        history=300, varThreshold=16, detectShadows=False)
+
+class ThreadedCapture:
+    """
+    Pembaca kamera di thread terpisah
+    
+    Thread pembaca terus mengambil frame (grab/retrieve) ke salah satu dari 3
+    buffer yang sudah dialokasikan, sementara loop utama memproses frame
+    sebelumnya. Dengan begitu kamera tidak menganggur selama proses deteksi,
+    dan loop utama selalu mendapat frame terbaru.
+    
+    Buffer ke-3 diperlukan karena loop utama masih memakai frame yang sedang
+    diproses saat thread pembaca menulis frame berikutnya.
+    """
+    def __init__(self, cap, target_fps=None):
+        self.cap = cap
+        self.target_fps = target_fps  # Frame di atas target ini di-grab lalu dibuang
+        w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 640
+        h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 480
+        self.buffers = [np.empty((h, w, 3), dtype=np.uint8) for _ in range(3)]
+        self.latest_idx = -1   # Buffer berisi frame terbaru
+        self.reading_idx = -1  # Buffer yang sedang dipakai loop utama
+        self.grabbed = True
+        self.lock = threading.Lock()
+        self.new_frame = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.update, daemon=True)
+        self.thread.start()
+    
+    def update(self):
+        """Loop thread: isi buffer yang sedang bebas dengan frame terbaru"""
+        last_retrieve = 0.0
+        while not self.stopped:
+            grabbed = self.cap.grab()
+            if grabbed and self.target_fps:
+                now = time.perf_counter()
+                if now - last_retrieve < 1.0 / self.target_fps:
+                    continue
+                last_retrieve = now
+            
+            if grabbed:
+                with self.lock:
+                    idx = next(i for i in range(3) if i not in (self.latest_idx, self.reading_idx))
+                # retrieve() menulis langsung ke buffer (dialokasikan ulang jika ukuran berbeda)
+                grabbed, self.buffers[idx] = self.cap.retrieve(self.buffers[idx])
+            
+            with self.lock:
+                self.grabbed = grabbed
+                if grabbed:
+                    self.latest_idx = idx
+            self.new_frame.set()
+            if not grabbed:
+                break
+    
+    def latest_frame(self, timeout=1.0):
+        """
+        Ambil frame terbaru (frame lama yang belum sempat diproses dilewati)
+        
+        Frame yang dikembalikan tetap valid sampai latest_frame() dipanggil lagi.
+        Selama thread pembaca masih berjalan, fungsi ini terus menunggu (kamera
+        DSHOW/MSMF bisa butuh beberapa detik untuk frame pertama). Gagal hanya
+        jika kamera berhenti mengirim frame atau capture sudah dilepas.
+        
+        Args:
+            timeout (float): Interval pengecekan status thread pembaca (detik)
+        
+        Returns:
+            tuple: (status berhasil, frame)
+        """
+        while not self.new_frame.wait(timeout):
+            if self.stopped or not self.thread.is_alive():
+                return False, None
+        with self.lock:
+            self.new_frame.clear()
+            if not self.grabbed:
+                return False, None
+            self.reading_idx = self.latest_idx
+            return True, self.buffers[self.reading_idx]
+    
+    def release(self):
+        """Hentikan thread dan lepaskan kamera"""
+        self.stopped = True
+        self.thread.join(timeout=1.0)
+        self.cap.release()
 
 class SimpleMotionDetector:
-    def __init__(self):
-        """Inisialisasi motion detector sederhana"""
+    def __init__(self, target_fps=None, headless=False, display_every_n=1,
+                 bg_subtractor_kind='mog2'):
+        """
+        Inisialisasi motion detector sederhana
+        
+        Args:
+            target_fps (float): Jumlah frame yang diproses per detik (minimal 1).
+                Jika None, diatur otomatis dari kecepatan proses 30 frame pertama.
+            headless (bool): Jalankan tanpa window (hanya statistik), hentikan
+                dengan Ctrl+C
+            display_every_n (int): Gambar teks dan tampilkan window hanya setiap
+                N frame. Deteksi tetap berjalan di semua frame.
+            bg_subtractor_kind (str): 'mog2' atau 'mog' (bgsegm), lihat
+                create_background_subtractor()
+        """
         # Background subtractor untuk mendeteksi objek bergerak
-        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
+        self.bg_subtractor = create_background_subtractor(bg_subtractor_kind)
         self.motion_threshold = 1000  # Area minimum untuk dianggap motion
+        if target_fps is not None and target_fps < 1:
+            raise ValueError(f"target_fps minimal 1, bukan {target_fps}")
+        self.target_fps = target_fps
+        self.headless = headless
+        self.display_every_n = max(1, int(display_every_n))
+        self.show_mask = False  # Window mask hanya untuk debug, ditoggle dengan 'm'
+        self._t_hist = deque(maxlen=30)  # Waktu 30 frame terakhir untuk FPS berjalan
+        # Kernel morfologi cukup dibuat sekali
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        # Buffer kerja process_frame, dipakai ulang setiap frame
+        self._detect_small = np.empty((240, 320, 3), dtype=np.uint8)
+        self._gray = np.empty((240, 320), dtype=np.uint8)
+        self._labels = np.empty((240, 320), dtype=np.int32)
+        
+    def process_frame(self, frame, frame_out, fg_mask_out):
+        """
+        Jalankan seluruh rantai deteksi untuk satu frame dalam satu panggilan
+        
+        Resize, grayscale, MOG2, morfologi, dan connected components dipanggil
+        berurutan ke buffer yang sudah dialokasikan, tanpa kerja Python di
+        antaranya. Setiap fungsi OpenCV melepas GIL selama berjalan.
+        
+        Args:
+            frame: Frame kamera (ukuran bebas)
+            frame_out: Buffer 640x480 BGR untuk frame tampilan
+            fg_mask_out: Buffer 320x240 untuk mask foreground
+            
+        Returns:
+            stats dari connectedComponentsWithStats tanpa label background
+        """
+        cv2.resize(frame, (640, 480), dst=frame_out)
+        cv2.resize(frame_out, (320, 240), dst=self._detect_small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._detect_small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        self.bg_subtractor.apply(self._gray, fgmask=fg_mask_out)
+        
+        # Hilangkan noise dengan morphology
+        cv2.morphologyEx(fg_mask_out, cv2.MORPH_CLOSE, self.kernel, dst=fg_mask_out)
+        cv2.morphologyEx(fg_mask_out, cv2.MORPH_OPEN, self.kernel, dst=fg_mask_out)
+        
+        # Area dan bounding box semua blob sekaligus; label 0 adalah background
+        _, _, stats, _ = cv2.connectedComponentsWithStats(
+            fg_mask_out, labels=self._labels, connectivity=8, ltype=cv2.CV_32S)
+        return stats[1:]
         
     def detect_motion(self, camera_id=0):
         """Deteksi motion dari webcam"""
-        cap = cv2.VideoCapture(camera_id)
+        # Buka kamera dengan backend native agar pengaturan buffer diterima
+        if sys.platform.startswith('win'):
+            cap = cv2.VideoCapture(camera_id, cv2.CAP_DSHOW)
+        elif sys.platform.startswith('linux'):
+            cap = cv2.VideoCapture(camera_id, cv2.CAP_V4L2)
+        else:
+            cap = cv2.VideoCapture(camera_id)
+        if not cap.isOpened():
+            cap.release()
+            cap = cv2.VideoCapture(camera_id)  # Coba backend default OpenCV
+        
+        # Simpan hanya 1 frame di buffer driver agar yang diproses selalu frame terbaru
+        try:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        except cv2.error:
+            pass  # Tidak semua backend mendukung pengaturan ini
         
         if not cap.isOpened():
             print(f"Kesalahan: Tidak bisa buka kamera {camera_id}")
@@ -29,82 +208,185 @@ class SimpleMotionDetector:
             return
             
         print("Motion Detection dimulai!")
-        print("Tekan 'q' untuk keluar")
+        print("Tekan Ctrl+C untuk keluar" if self.headless else "Tekan 'q' untuk keluar")
+        if not self.headless:
+            print("Tekan 'm' untuk menampilkan/menyembunyikan window mask")
         print("Tunggu beberapa detik untuk kalibrasi background...")
         
         frame_count = 0
         motion_count = 0
+        process_time = 0.0
+        scale = 2  # Deteksi di 320x240, kotak digambar di 640x480
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+        # Kamera dibaca di thread terpisah; frame yang datang lebih cepat dari
+        # target_fps hanya di-grab (tanpa decode) lalu dibuang
+        stream = ThreadedCapture(cap, self.target_fps)
+        
+        # Pipeline 2 tahap dengan 2 slot bergantian (ping-pong):
+        # tahap A (thread) mengisi slot dengan frame, mask, dan blob, tahap B
+        # (loop ini) menggambar dan menampilkan slot yang sudah siap
+        slots = [[np.empty((480, 640, 3), dtype=np.uint8),  # Frame tampilan
+                  np.empty((240, 320), dtype=np.uint8),     # Mask foreground
+                  False,                                    # Frame berhasil dibaca
+                  0.0,                                      # Waktu proses tahap A
+                  None]                                     # Stats blob
+                 for _ in range(2)]
+        ready = [threading.Event(), threading.Event()]  # Slot sudah diisi tahap A
+        free = [threading.Event(), threading.Event()]   # Slot sudah dipakai tahap B
+        for event in free:
+            event.set()
+        stop = threading.Event()
+        preprocess_thread = threading.Thread(
+            target=self._preprocess_loop, args=(stream, slots, ready, free, stop), daemon=True)
+        preprocess_thread.start()
+        
+        idx = 0
+        try:
+            while True:
+                ready[idx].wait()
+                ready[idx].clear()
+                frame, fg_mask, ret, preprocess_time, stats = slots[idx]
+                if not ret:
+                    break
+                last_process_t = time.perf_counter()
+                self._t_hist.append(last_process_t)
                 
-            frame_count += 1
+                frame_count += 1
             
-            # Resize frame agar tidak terlalu besar
-            frame = cv2.resize(frame, (640, 480))
+                # Area di 320x240 dikali 4 agar sebanding dengan threshold 640x480
+                areas = stats[:, cv2.CC_STAT_AREA] * (scale * scale)
+                keep = areas > self.motion_threshold
             
-            # Terapkan background subtraction
-            fg_mask = self.bg_subtractor.apply(frame)
+                motion_detected = bool(keep.any())
+                motion_count += motion_detected  # Dihitung sekali per frame, bukan per blob
             
-            # Hilangkan noise dengan morphology
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-            fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_CLOSE, kernel)
-            fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, kernel)
+                # Target FPS otomatis dari tahap paling lambat pada 30 frame pertama
+                if self.target_fps is None and frame_count <= 30:
+                    process_time += max(time.perf_counter() - last_process_t, preprocess_time)
+                    if frame_count == 30:
+                        stream.target_fps = max(1.0, frame_count / process_time)
+                        print(f"Target FPS otomatis: {stream.target_fps:.1f}")
             
-            # Cari kontur objek bergerak
-            contours, _ = cv2.findContours(fg_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                if self.headless:
+                    free[idx].set()
+                    idx = 1 - idx
+                    continue
             
-            motion_detected = False
-            total_area = 0
+                # Gambar dan tampilkan hanya setiap display_every_n frame
+                show = frame_count % self.display_every_n == 0
             
-            # Gambar kotak di sekitar objek bergerak
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if area > self.motion_threshold:
-                    motion_detected = True
-                    motion_count += 1
-                    total_area += area
-                    
-                    # Gambar bounding box
-                    x, y, w, h = cv2.boundingRect(contour)
+                # Gambar kotak di sekitar objek bergerak (dikembalikan ke ukuran 640x480)
+                for x, y, w, h in (stats[keep, :4] * scale).tolist() if show else ():
                     cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
                     cv2.putText(frame, 'MOTION', (x, y-10), 
                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
             
-            # Tampilkan informasi
-            status_text = "GERAKAN TERDETEKSI!" if motion_detected else "Tidak ada gerakan"
-            color = (0, 0, 255) if motion_detected else (0, 255, 0)
-            cv2.putText(frame, status_text, (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-            
-            # Hitung persentase motion
-            motion_percent = (motion_count / frame_count * 100) if frame_count > 0 else 0
-            cv2.putText(frame, f'Motion: {motion_percent:.1f}%', (10, 70), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-            
-            cv2.putText(frame, f'Area: {int(total_area)}', (10, 110), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                if show:
+                    # Persentase dan total area hanya dihitung saat frame ditampilkan
+                    motion_percent = motion_count * 100.0 / frame_count
+                    total_area = int(areas[keep].sum())
+                    
+                    # Tampilkan informasi
+                    status_text = "GERAKAN TERDETEKSI!" if motion_detected else "Tidak ada gerakan"
+                    color = (0, 0, 255) if motion_detected else (0, 255, 0)
+                    cv2.putText(frame, status_text, (10, 30), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+                
+                    cv2.putText(frame, f'Motion: {motion_percent:.1f}%', (10, 70), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+                
+                    cv2.putText(frame, f'Area: {int(total_area)}', (10, 110), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                    
+                    # FPS dihitung dari 30 frame terakhir hanya saat ditampilkan
+                    span = self._t_hist[-1] - self._t_hist[0]
+                    fps = (len(self._t_hist) - 1) / span if span > 0 else 0
+                    cv2.putText(frame, f'FPS: {fps:.1f}', (10, 150), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                
+                    # Tampilkan hasil (imshow dan waitKey harus di thread pemilik window)
+                    cv2.imshow('Motion Detection - Tekan Q untuk keluar', frame)
+                    if self.show_mask:
+                        cv2.imshow('Motion Mask', fg_mask)
+                # waitKey tetap dipanggil setiap frame agar tombol selalu responsif
+                key = cv2.waitKey(1) & 0xFF
             
-            # Tampilkan hasil
-            cv2.imshow('Motion Detection - Tekan Q untuk keluar', frame)
-            cv2.imshow('Motion Mask', fg_mask)
+                # Slot boleh diisi lagi oleh tahap A
+                free[idx].set()
+                idx = 1 - idx
             
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+                if key == ord('q'):
+                    break
+                elif key == ord('m'):
+                    # Window dibuat saat diaktifkan agar selalu ada ketika ditutup
+                    self.show_mask = not self.show_mask
+                    if self.show_mask:
+                        cv2.namedWindow('Motion Mask')
+                    else:
+                        cv2.destroyWindow('Motion Mask')
+        except KeyboardInterrupt:
+            pass  # Ctrl+C untuk berhenti, terutama pada mode headless
         
-        cap.release()
-        cv2.destroyAllWindows()
+        stop.set()
+        for event in free:
+            event.set()  # Bangunkan tahap A jika sedang menunggu slot
+        preprocess_thread.join(timeout=1.0)
+        stream.release()
+        if not self.headless:
+            cv2.destroyAllWindows()
         
+        motion_percent = (motion_count * 100.0 / frame_count) if frame_count > 0 else 0
         print(f"\nStatistik:")
         print(f"Total frame: {frame_count}")
         print(f"Frame dengan motion: {motion_count}")
         print(f"Persentase motion: {motion_percent:.1f}%")
 
+    def _preprocess_loop(self, stream, slots, ready, free, stop):
+        """
+        Tahap A pipeline: ambil frame lalu jalankan process_frame
+        
+        Hasilnya ditulis ke slot secara bergantian. Slot hanya diisi setelah
+        tahap B selesai memakainya (event free), lalu ditandai siap (event ready).
+        """
+        idx = 0
+        while not stop.is_set():
+            free[idx].wait()
+            if stop.is_set():
+                break
+            free[idx].clear()
+            slot = slots[idx]
+            
+            # Jika terjadi error, slot tetap ditandai siap (gagal) agar tahap B
+            # tidak menunggu selamanya dan kamera tetap dilepas
+            ret = False
+            start_t = time.perf_counter()
+            try:
+                ok, frame = stream.latest_frame()
+                start_t = time.perf_counter()
+                if ok:
+                    slot[4] = self.process_frame(frame, slot[0], slot[1])
+                ret = ok
+            finally:
+                slot[2] = ret
+                slot[3] = time.perf_counter() - start_t
+                ready[idx].set()
+            if not ret:
+                break
+            idx = 1 - idx
+
 def main():
+    parser = argparse.ArgumentParser(description="Motion Detection Sederhana")
+    parser.add_argument('--bg', choices=['mog2', 'mog'], default='mog2',
+                        help="Background subtractor: mog2 (default) atau mog "
+                             "(bgsegm, butuh opencv-contrib-python)")
+    args = parser.parse_args()
+    
     print("=== Motion Detection Sederhana ===")
-    detector = SimpleMotionDetector()
+    # Pastikan jalur SIMD/IPP OpenCV aktif. Thread internal OpenCV dibatasi
+    # agar tidak berebut core dengan thread kamera dan tahap preprocessing.
+    cv2.setUseOptimized(True)
+    cv2.setNumThreads(max(1, (os.cpu_count() or 2) - 2))
+    detector = SimpleMotionDetector(bg_subtractor_kind=args.bg)
     
     # Pilihan kamera langsung
     print("\nPilih kamera:")